@@ -1,15 +1,40 @@
 import abc
+import concurrent.futures
+import datetime
+import os
+import selectors
 import signal
+import socket
+import threading
 import time
 
-__all__ = ["Application"]
+try:
+    import logs
+except ImportError:
+    logs = None
+
+__all__ = ["Application", "Job", "CronSpec"]
 
 
 class Signals(object):
     def __init__(self):
         self.recvd = []
+        self._lock = threading.Lock()
+
+        # any byte on this pair wakes up `wait`; the signal module writes the
+        # signal number itself, `notify` lets other threads do the same.
+        self._rsock, self._wsock = socket.socketpair()
+        self._rsock.setblocking(False)
+        self._wsock.setblocking(False)
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self._rsock, selectors.EVENT_READ)
+        try:
+            signal.set_wakeup_fd(self._wsock.fileno())
+        except ValueError:
+            # not the main thread, signals still land in `recvd` on the next wakeup.
+            pass
 
-        for name in ("SIGINT", "SIGTERM", "SIGHUP", "SIGQUIT", "SIGUSER1"):
+        for name in ("SIGINT", "SIGTERM", "SIGHUP", "SIGQUIT", "SIGUSR1"):
             if not hasattr(signal, name):
                 continue
             signal_ = getattr(signal, name)
@@ -17,22 +42,170 @@ class Signals(object):
                 signal.signal(signal_, self.handler)
 
     def handler(self, signal_, frame):
-        if signal_ not in self.recvd:
-            self.recvd.append(signal_)
+        with self._lock:
+            if signal_ not in self.recvd:
+                self.recvd.append(signal_)
 
     def check(self):
-        if self.recvd:
-            return self.recvd.pop(0)
+        with self._lock:
+            if self.recvd:
+                return self.recvd.pop(0)
         return None
 
+    def notify(self):
+        try:
+            self._wsock.send(b"\0")
+        except (BlockingIOError, OSError):
+            pass
+
+    def fileno(self):
+        return self._rsock.fileno()
+
+    def drain(self):
+        try:
+            while self._rsock.recv(4096):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+
+    def wait(self, timeout=None):
+        if self.recvd:
+            return True
+        events = self._selector.select(timeout)
+        self.drain()
+        return bool(events)
+
+    def reset(self):
+        # called in forked workers, the supervisor owns the signals.
+        signal.set_wakeup_fd(-1)
+        self._selector.close()
+        self._rsock.close()
+        self._wsock.close()
+        # a signal sent to the whole process group must not kill jobs in flight,
+        # workers exit once the supervisor closes their socket.
+        for name in ("SIGINT", "SIGTERM", "SIGHUP", "SIGQUIT", "SIGUSR1"):
+            if hasattr(signal, name):
+                signal.signal(getattr(signal, name), signal.SIG_IGN)
+
+
+class CronSpec(object):
+    """
+    Classic 5 fields cron spec: minute hour day month weekday.
+    Supports `*`, `a`, `a-b`, `a,b` and `/step` on each field, weekday 0 or 7 is sunday.
+    """
+
+    _ranges = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, spec: str):
+        fields = spec.split()
+        if len(fields) != 5:
+            raise ValueError(f"invalid cron spec: {spec}")
+        self.spec = spec
+        self.minutes, self.hours, self.days, self.months, weekdays = [
+            self._parse(field, lo, hi) for field, (lo, hi) in zip(fields, self._ranges)
+        ]
+        self.weekdays = {d % 7 for d in weekdays}
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+
+    @staticmethod
+    def _parse(field, lo, hi):
+        values = set()
+        for part in field.split(","):
+            step = 1
+            if "/" in part:
+                part, step = part.split("/", 1)
+                step = int(step)
+            if part == "*":
+                start, end = lo, hi
+            elif "-" in part:
+                start, end = (int(x) for x in part.split("-", 1))
+            else:
+                start = int(part)
+                end = hi if step > 1 else start
+            if not lo <= start <= end <= hi or step < 1:
+                raise ValueError(f"invalid cron field: {field}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _match_day(self, d):
+        weekday = d.isoweekday() % 7
+        if self._any_day or self._any_weekday:
+            return d.day in self.days and weekday in self.weekdays
+        return d.day in self.days or weekday in self.weekdays
+
+    def next(self, now: float) -> float:
+        d = datetime.datetime.fromtimestamp(now).replace(second=0, microsecond=0)
+        d += datetime.timedelta(minutes=1)
+        limit = d + datetime.timedelta(days=366 * 5)
+        while d < limit:
+            if d.month not in self.months:
+                d = (d.replace(day=1, hour=0, minute=0) + datetime.timedelta(days=32)).replace(day=1)
+            elif not self._match_day(d):
+                d = d.replace(hour=0, minute=0) + datetime.timedelta(days=1)
+            elif d.hour not in self.hours:
+                d = d.replace(minute=0) + datetime.timedelta(hours=1)
+            elif d.minute not in self.minutes:
+                d += datetime.timedelta(minutes=1)
+            else:
+                return d.timestamp()
+        raise ValueError(f"cron spec never fires: {self.spec}")
+
+
+class Job(object):
+    def __init__(self, func, interval=None, cron=None, max_instances=1, name=None, delay=0):
+        if (interval is None) == (cron is None):
+            raise ValueError("exactly one of interval and cron is required.")
+        self.func = func
+        self.interval = interval
+        self.cron = CronSpec(cron) if isinstance(cron, str) else cron
+        self.max_instances = max_instances
+        self.name = name or getattr(func, "__name__", repr(func))
+        self.running = 0
+        self.next_run = self.cron.next(time.time()) if self.cron else time.time() + delay
+
+    def reschedule(self, now: float):
+        if self.cron:
+            self.next_run = self.cron.next(now)
+            return
+        # keep a fixed cadence, but skip the ticks a slow run has already missed.
+        self.next_run += self.interval
+        if self.next_run <= now:
+            self.next_run = now + self.interval
+
+    def __repr__(self):
+        return f"<Job {self.name} next_run={self.next_run}>"
+
+
+_RESTART_DELAY = 0.5
+_RESTART_MAX_DELAY = 30
+
+
+class _Worker(object):
+    def __init__(self, pid, sock):
+        self.pid = pid
+        self.sock = sock
+        self.job = None
+        self.retiring = False
+        self.crashes = 0
+
+    def fileno(self):
+        return self.sock.fileno()
+
 
 class Application(object):
-    def __init__(self):
+    def __init__(self, workers=4):
         self.interrupted = False
         self.watchdog = Signals()
+        self.workers = workers
+        self.jobs = []
+        self._lock = threading.Lock()
+        self._workers = []
+        self._pending = []
 
     def shutdown(self):
         self.interrupted = True
+        self.watchdog.notify()
 
     @property
     def is_interrupted(self) -> bool:
@@ -43,24 +216,199 @@ class Application(object):
         if signal_:
             self.interrupted = True
 
+    def add_job(self, func, interval=None, cron=None, max_instances=1, name=None, delay=0) -> Job:
+        """
+        Register `func` to run every `interval` seconds or on a `cron` spec.
+        At most `max_instances` runs of the same job overlap, extra ticks are skipped.
+        """
+        job = Job(func, interval=interval, cron=cron, max_instances=max_instances, name=name, delay=delay)
+        with self._lock:
+            self.jobs.append(job)
+        self.watchdog.notify()
+        return job
+
+    def _finished(self, job, future):
+        with self._lock:
+            job.running -= 1
+        err = future.exception()
+        if err is not None:
+            self.handle_error(err)
+
+    def _submit(self, executor, job):
+        with self._lock:
+            if job.running >= job.max_instances:
+                return
+            job.running += 1
+        future = executor.submit(job.func)
+        future.add_done_callback(lambda f: self._finished(job, f))
+
     def run_forever(self):
-        started, recovery = 0, 55
-        while not self.interrupted:
-            try:
-                time.sleep(0.1)
-            except Exception as err:
-                self.handle_error(err)
-                break
+        if not self.jobs:
+            self.add_job(self.working, interval=55)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while not self.interrupted:
+                now = time.time()
+                with self._lock:
+                    jobs = list(self.jobs)
+                for job in jobs:
+                    if job.next_run <= now:
+                        self._submit(executor, job)
+                        job.reschedule(now)
 
-            self.check_signals()
+                deadline = min((job.next_run for job in jobs), default=now + 60)
+                try:
+                    self.watchdog.wait(max(deadline - time.time(), 0))
+                except Exception as err:
+                    self.handle_error(err)
+                    break
 
-            if int(time.time()) - started > recovery:
+                self.check_signals()
+
+    def _worker_main(self, sock):
+        code = 0
+        try:
+            self.watchdog.reset()
+            for worker in self._workers:
+                worker.sock.close()
+            rfile = sock.makefile("rb")
+            for line in rfile:
+                job = self.jobs[int(line)]
                 try:
-                    self.working()
+                    job.func()
+                    status = b"ok\n"
                 except Exception as err:
                     self.handle_error(err)
-                finally:
-                    started = int(time.time())
+                    status = b"err\n"
+                sock.sendall(status)
+        except BaseException:
+            code = 1
+        finally:
+            # os._exit skips atexit, write out what the background log writers still hold.
+            if logs:
+                try:
+                    logs.flush()
+                except Exception:
+                    pass
+            os._exit(code)
+
+    def _spawn(self, selector, crashes=0) -> _Worker:
+        parent, child = socket.socketpair()
+        pid = os.fork()
+        if pid == 0:
+            parent.close()
+            self._worker_main(child)
+        child.close()
+        worker = _Worker(pid, parent)
+        worker.crashes = crashes
+        self._workers.append(worker)
+        selector.register(worker, selectors.EVENT_READ)
+        return worker
+
+    def _reap(self, selector, worker):
+        selector.unregister(worker)
+        worker.sock.close()
+        self._workers.remove(worker)
+        _, status = os.waitpid(worker.pid, 0)
+        return status
+
+    def _assign(self):
+        for worker in self._workers:
+            if not self._pending:
+                return
+            if worker.job is None and not worker.retiring:
+                job = self._pending.pop(0)
+                worker.job = job
+                try:
+                    worker.sock.sendall(b"%d\n" % self.jobs.index(job))
+                except OSError:
+                    # the worker died, its EOF is picked up by the select loop.
+                    pass
+
+    def reload(self):
+        """Called by the supervisor on SIGHUP, before workers are replaced."""
+        pass
+
+    def run_supervisor(self, processes=None):
+        """
+        Prefork `processes` workers (default: cpu count) and dispatch job runs to them.
+        Crashed workers are restarted with an exponential backoff (0.5s doubling up to 30s,
+        reset once the slot completes a job), SIGHUP calls `reload` then replaces every worker
+        once it is idle, other signals stop dispatching and drain the running jobs.
+        Jobs must be added before calling this, otherwise every worker runs `working`.
+        """
+        if not hasattr(os, "fork"):
+            raise RuntimeError("supervisor mode requires os.fork.")
+        processes = processes or os.cpu_count() or 1
+        if not self.jobs:
+            for i in range(processes):
+                self.add_job(self.working, interval=55, name=f"working-{i}")
+
+        selector = selectors.DefaultSelector()
+        selector.register(self.watchdog, selectors.EVENT_READ)
+        for _ in range(processes):
+            self._spawn(selector)
+
+        respawns = []  # (due, crashes) of the slots whose worker crashed
+        while self._workers or (respawns and not self.interrupted):
+            now = time.time()
+            if not self.interrupted:
+                for due, crashes in [r for r in respawns if r[0] <= now]:
+                    respawns.remove((due, crashes))
+                    self._spawn(selector, crashes)
+                for job in self.jobs:
+                    if job.next_run <= now:
+                        if job.running < job.max_instances:
+                            job.running += 1
+                            self._pending.append(job)
+                        job.reschedule(now)
+                self._assign()
+
+            timeout = None
+            if not self.interrupted:
+                deadline = min([job.next_run for job in self.jobs] + [due for due, _ in respawns])
+                timeout = max(deadline - time.time(), 0)
+            for key, _ in selector.select(timeout):
+                if key.fileobj is self.watchdog:
+                    self.watchdog.drain()
+                    continue
+                worker = key.fileobj
+                job, worker.job = worker.job, None
+                if job is not None:
+                    job.running -= 1
+                try:
+                    reply = worker.sock.recv(64)
+                except OSError:
+                    reply = b""
+                if reply:
+                    worker.crashes = 0
+                    continue
+                status = self._reap(selector, worker)
+                self.handle_error(RuntimeError(f"worker {worker.pid} exited, status {status}."))
+                if not self.interrupted:
+                    delay = min(_RESTART_DELAY * 2 ** worker.crashes, _RESTART_MAX_DELAY)
+                    respawns.append((time.time() + delay, worker.crashes + 1))
+
+            signal_ = self.watchdog.check()
+            while signal_:
+                if signal_ == getattr(signal, "SIGHUP", None):
+                    self.reload()
+                    for worker in self._workers:
+                        worker.retiring = True
+                else:
+                    self.interrupted = True
+                signal_ = self.watchdog.check()
+
+            if self.interrupted:
+                for job in self._pending:
+                    job.running -= 1
+                self._pending.clear()
+            for worker in list(self._workers):
+                if worker.job is None and (worker.retiring or self.interrupted):
+                    self._reap(selector, worker)
+                    if not self.interrupted:
+                        self._spawn(selector)
+        selector.close()
 
     @abc.abstractmethod
     def working(self):
@@ -0,0 +1,314 @@
+"""
+Benchmarks for pytool, data sizes are fixed so results are comparable between runs.
+
+    python benchmarks.py -o result.json
+    python benchmarks.py -b result.json --threshold 0.2
+
+Benchmarks whose dependency is missing (loguru, sqlalchemy, the crypto library) are skipped.
+"""
+import argparse
+import contextlib
+import json
+import math
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+_benchmarks = []
+
+
+class Skip(Exception):
+    pass
+
+
+def benchmark(name, number):
+    """
+    Register `setup(tmpdir) -> callable | (callable, teardown)`.
+    The callable is timed at least `number` times per repeat, more if that takes under `min_time`.
+    """
+
+    def _decorator(setup):
+        _benchmarks.append((name, number, setup))
+        return setup
+
+    return _decorator
+
+
+@contextlib.contextmanager
+def _chdir(path):
+    cwd = os.getcwd()
+    os.chdir(path)
+    try:
+        yield path
+    finally:
+        os.chdir(cwd)
+
+
+@benchmark("utils.scan_dirs[20x50 files]", number=20)
+def bench_scan_dirs(tmpdir):
+    import utils
+
+    root = os.path.join(tmpdir, "scan")
+    for i in range(20):
+        sub = os.path.join(root, str(i))
+        os.makedirs(sub)
+        for j in range(50):
+            ext = ".tmp" if j % 10 == 0 else ".dat"
+            with open(os.path.join(sub, f"{j}{ext}"), "wb") as fd:
+                fd.write(b"x" * j)
+    return lambda: utils.scan_dirs(root)
+
+
+@benchmark("utils.md5file[8MB]", number=5)
+def bench_md5file(tmpdir):
+    import utils
+
+    path = os.path.join(tmpdir, "md5.bin")
+    with open(path, "wb") as fd:
+        fd.write(os.urandom(8 * 1024 * 1024))
+    return lambda: utils.md5file(path)
+
+
+@benchmark("utils.compress+decompress[1MB]", number=10)
+def bench_compress(tmpdir):
+    import utils
+
+    raw = (b"pytool benchmark " * 65536)[: 1024 * 1024]
+    return lambda: utils.decompress(utils.compress(raw))
+
+
+@benchmark("utils.b64encode+b64decode[1MB]", number=20)
+def bench_b64(tmpdir):
+    import utils
+
+    raw = os.urandom(1024 * 1024)
+    return lambda: utils.b64decode(utils.b64encode(raw))
+
+
+@benchmark("utils.b64encode2+b64decode2[1MB]", number=20)
+def bench_b64_2(tmpdir):
+    import utils
+
+    raw = os.urandom(1024 * 1024)
+    return lambda: utils.b64decode2(utils.b64encode2(raw))
+
+
+@benchmark("utils.randstr[32]x1000", number=10)
+def bench_randstr(tmpdir):
+    import utils
+
+    return lambda: [utils.randstr(32) for _ in range(1000)]
+
+
+@benchmark("utils.uid x1000", number=10)
+def bench_uid(tmpdir):
+    import utils
+
+    return lambda: [utils.uid() for _ in range(1000)]
+
+
+def _nested(depth=5, width=10):
+    if depth == 0:
+        return "value"
+    return {f"k{i}": _nested(depth - 1, width) for i in range(width)}
+
+
+@benchmark("utils.rgets[depth 5]x1000", number=10)
+def bench_rgets(tmpdir):
+    import utils
+
+    container = _nested(5, 4)
+    return lambda: [utils.rgets(container, "k1.k2.k3.k0.k1") for _ in range(1000)]
+
+
+@benchmark("configs.IniConfig.get x1000", number=10)
+def bench_config_get(tmpdir):
+    import configs
+
+    path = os.path.join(tmpdir, "bench.ini")
+    with open(path, "w") as fd:
+        for s in range(20):
+            fd.write(f"[section{s}]\n")
+            for o in range(20):
+                fd.write(f"option{o} = value{o}\n")
+    cfg = configs.IniConfig(path)
+    return lambda: [cfg.get("section10.option10") for _ in range(1000)]
+
+
+@benchmark("cryptos.encrypt+decrypt[64KB]", number=20)
+def bench_encrypt(tmpdir):
+    import cryptos
+
+    raw = os.urandom(64 * 1024)
+    try:
+        cryptos.decrypt(cryptos.encrypt(raw))
+    except OSError as err:
+        raise Skip(f"crypto library not available: {err}")
+    return lambda: cryptos.decrypt(cryptos.encrypt(raw))
+
+
+@benchmark("dbs.MySQLDatabase CRUD[sqlite, 100 rows]", number=5)
+def bench_database(tmpdir):
+    try:
+        import sqlalchemy
+        import dbs
+    except ImportError as err:
+        raise Skip(str(err))
+
+    class BenchRecord(dbs.Model):
+        __tablename__ = "bench_record"
+        __table_args__ = {"extend_existing": True}
+        id = sqlalchemy.Column(sqlalchemy.Integer, primary_key=True)
+        name = sqlalchemy.Column(sqlalchemy.String(32))
+        value = sqlalchemy.Column(sqlalchemy.Integer)
+
+    # MySQLDatabase always builds a mysql url, point it at a local sqlite file instead.
+    db = dbs.MySQLDatabase.__new__(dbs.MySQLDatabase)
+    db._engine = sqlalchemy.create_engine("sqlite:///" + os.path.join(tmpdir, "bench.db"))
+    db._session_cls = dbs.sqla_sessionmaker(bind=db._engine, autocommit=False, autoflush=True)
+    dbs.Model.metadata.create_all(db._engine, tables=[BenchRecord.__table__])
+
+    def _crud():
+        db.add(BenchRecord, [BenchRecord(name=f"r{i}", value=i) for i in range(100)])
+        db.query(BenchRecord, {BenchRecord.value: list(range(50))})
+        db.update(BenchRecord, {BenchRecord.value: list(range(50))}, {BenchRecord.name: "updated"})
+        db.delete(BenchRecord, {BenchRecord.name: ["updated"] + [f"r{i}" for i in range(100)]})
+
+    return _crud
+
+
+def _bench_logger(tmpdir, asynchronous):
+    try:
+        import logs
+    except ImportError as err:
+        raise Skip(str(err))
+
+    # block rather than drop on overflow, so the async run measures sustained throughput.
+    logs.setAsync(asynchronous, overflow=logs.BLOCK)
+    with _chdir(tmpdir):
+        log = logs.getFileLogger(f"bench.{'async' if asynchronous else 'sync'}")
+
+    def _logging():
+        for i in range(1000):
+            log.info("benchmark record {}", i)
+
+    def _teardown():
+        logs.flush()
+        logs.setAsync(False)
+
+    return _logging, _teardown
+
+
+@benchmark("logs.getFileLogger sync x1000", number=5)
+def bench_logger_sync(tmpdir):
+    return _bench_logger(tmpdir, False)
+
+
+@benchmark("logs.getFileLogger async x1000", number=5)
+def bench_logger_async(tmpdir):
+    return _bench_logger(tmpdir, True)
+
+
+def _calibrate(func, number, min_time):
+    st = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - st
+    if elapsed <= 0:
+        return max(number, 1000)
+    return max(number, math.ceil(min_time / elapsed))
+
+
+def run(repeat=7, pattern=None, min_time=0.25):
+    results = {}
+    for name, number, setup in _benchmarks:
+        if pattern and pattern not in name:
+            continue
+        with tempfile.TemporaryDirectory() as tmpdir:
+            try:
+                func = setup(tmpdir)
+            except Skip as err:
+                results[name] = {"skipped": str(err)}
+                print(f"{name:<45} skipped: {err}", file=sys.stderr)
+                continue
+            func, teardown = func if isinstance(func, tuple) else (func, None)
+            try:
+                func()  # warm up
+                loops = _calibrate(func, number, min_time)
+                timings = []
+                for _ in range(repeat):
+                    st = time.perf_counter()
+                    for _ in range(loops):
+                        func()
+                    timings.append((time.perf_counter() - st) / loops)
+            finally:
+                if teardown:
+                    teardown()
+        results[name] = {
+            "number": loops,
+            "repeat": repeat,
+            "min": min(timings),
+            "median": statistics.median(timings),
+        }
+        print(f"{name:<45} {results[name]['min'] * 1000:10.3f} ms", file=sys.stderr)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold=0.2):
+    """
+    Return benchmarks whose best time got slower than baseline by more than `threshold`
+    and by more than the noise, the min to median spread of either run.
+    """
+    regressions = {}
+    for name, result in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base or "min" not in base or "min" not in result:
+            continue
+        ratio = result["min"] / base["min"]
+        spread = max(result["median"] / result["min"], base["median"] / base["min"]) - 1
+        print(f"{name:<45} {ratio:6.2f}x baseline (noise {spread:.0%})", file=sys.stderr)
+        if ratio > 1 + max(threshold, spread):
+            regressions[name] = ratio
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="pytool benchmarks")
+    parser.add_argument("-o", "--output", help="write json results to this path, default stdout")
+    parser.add_argument("-b", "--baseline", help="compare against a saved json result")
+    parser.add_argument("-t", "--threshold", type=float, default=0.2, help="allowed slowdown, default 0.2")
+    parser.add_argument("-r", "--repeat", type=int, default=7)
+    parser.add_argument("-k", "--pattern", help="only run benchmarks whose name contains this")
+    parser.add_argument("--min-time", type=float, default=0.25, help="minimum seconds per timing, default 0.25")
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    current = run(args.repeat, args.pattern, args.min_time)
+    raw = json.dumps(current, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as fd:
+            fd.write(raw)
+    else:
+        print(raw)
+
+    if args.baseline:
+        with open(args.baseline) as fd:
+            baseline = json.load(fd)
+        regressions = compare(current, baseline, args.threshold)
+        for name, ratio in regressions.items():
+            print(f"REGRESSION {name}: {ratio:.2f}x slower", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
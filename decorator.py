@@ -1,5 +1,7 @@
 import functools
+import threading
 import time
+import tracemalloc
 
 
 __all__ = ["retry", "ignore_errors", "profiles", "snapshot"]
@@ -55,5 +57,137 @@ def profiles(logger):
     return _decorator
 
 
-def snapshot():
-    pass
+# tracemalloc is process wide: count the snapshots in flight and only stop
+# tracing when the last one is done, and only if it was started here.
+_tracing = {"users": 0, "owned": False}
+_tracing_lock = threading.Lock()
+
+
+def _acquire_tracing(frames):
+    with _tracing_lock:
+        if _tracing["users"] == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            _tracing["owned"] = True
+        _tracing["users"] += 1
+
+
+def _release_tracing():
+    with _tracing_lock:
+        _tracing["users"] -= 1
+        if _tracing["users"] == 0 and _tracing["owned"]:
+            _tracing["owned"] = False
+            tracemalloc.stop()
+
+
+class _Snapshot(object):
+    _ignores = (
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    )
+
+    def __init__(self, logger=None, every=1, top=10, key_type="lineno", frames=1):
+        self.logger = logger
+        self.every = max(int(every), 1)
+        self.top = top
+        self.key_type = key_type
+        self.frames = frames
+        self.calls = 0
+        self.stats = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def _stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def _sampled(self):
+        with self._lock:
+            self.calls += 1
+            return (self.calls - 1) % self.every == 0
+
+    def _take(self):
+        return tracemalloc.take_snapshot().filter_traces(self._ignores)
+
+    def _failed(self, name, err):
+        if self.logger:
+            self.logger.warning("{name} snapshot failed: {err}".format(name=name, err=err))
+
+    def start(self, name="snapshot"):
+        before = None
+        try:
+            _acquire_tracing(self.frames)
+            try:
+                before = self._take()
+            except Exception:
+                _release_tracing()
+                raise
+        except Exception as err:
+            self._failed(name, err)
+        self._stack.append(before)
+
+    def stop(self, name="snapshot"):
+        before = self._stack.pop()
+        if before is None:
+            return []
+        try:
+            try:
+                after = self._take()
+            finally:
+                _release_tracing()
+            stats = after.compare_to(before, self.key_type)
+            self.stats = stats  # last result, for inspection only
+            self.report(name, stats)
+        except Exception as err:
+            self._failed(name, err)
+            return []
+        return stats
+
+    def report(self, name, stats):
+        if not self.logger:
+            return
+        by_size = sorted(stats, key=lambda s: abs(s.size_diff), reverse=True)[: self.top]
+        by_count = sorted(stats, key=lambda s: abs(s.count_diff), reverse=True)[: self.top]
+        total = sum(s.size_diff for s in stats)
+        self.logger.info("{name} memory grew {size} bytes.".format(name=name, size=total))
+        for stat in by_size:
+            self.logger.info("{name} top size: {stat}".format(name=name, stat=stat))
+        for stat in by_count:
+            self.logger.info("{name} top count: {stat}".format(name=name, stat=stat))
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+        return False
+
+    def __call__(self, func):
+        @functools.wraps(func)
+        def _wrapper(*args, **kwargs):
+            if not self._sampled():
+                return func(*args, **kwargs)
+            self.start(func.__name__)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.stop(func.__name__)
+
+        _wrapper.snapshot = self
+        return _wrapper
+
+
+def snapshot(logger=None, every=1, top=10, key_type="lineno", frames=1):
+    """
+    Diff tracemalloc snapshots taken around a call, usable as decorator or context manager.
+    :param logger: receives the top allocation sites, skipped if None
+    :param every: only profile one of every N invocations
+    :param top: how many allocation sites to report by size and by count growth
+    :param key_type: "lineno", "filename" or "traceback"
+    :param frames: traceback depth, only used when tracing is not started yet
+    """
+    return _Snapshot(logger, every, top, key_type, frames)
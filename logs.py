@@ -1,11 +1,15 @@
+import atexit
 import functools
 import os
+import queue
 import sys
+import threading
 
 from loguru._colorizer import Colorizer
+from loguru._file_sink import FileSink
 from loguru._logger import Core, Logger, Level
 
-__all__ = ["getLogger", "getFileLogger", "setLevel"]
+__all__ = ["getLogger", "getFileLogger", "setLevel", "setAsync", "getStats", "flush"]
 
 LOG_FORMAT = "{time:YYYY/MM/DD HH:mm:ss.SS} [{level: <8}] {module}.{function}[{line}]: {message}"
 sys.tracebacklimit = 2
@@ -15,10 +19,128 @@ INFO = "INFO"
 WARNING = "WARNING"
 ERROR = "ERROR"
 
+# overflow policies of the background writer
+DROP = "drop"
+BLOCK = "block"
 
-@functools.lru_cache(maxsize=10)
-def getLogger(module):
-    # type: (str) -> Logger
+_async = {"enabled": False, "maxsize": 10000, "batch_size": 512, "overflow": DROP}
+_sinks = {}
+_sinks_lock = threading.Lock()
+_STOP = object()
+_orphans = []  # writers inherited through fork, see _after_fork_in_child
+
+
+class _Sink(object):
+    """
+    One sink per destination, shared by every logger writing there.
+    Writes inline, or through a bounded queue drained in batches by a background thread.
+    """
+
+    def __init__(self, name, opener):
+        self.name = name
+        self._opener = opener
+        self._write, self._flush = opener()
+        self._reset()
+        self.written = 0
+        self.dropped = 0
+
+    def _reset(self):
+        # `_lock` only guards the queue swap, puts happen outside of it and are counted
+        # in `_putting` so `stop` can wait for them before sending the stop marker.
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._write_lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+        self._putting = 0
+        self._overflow = DROP
+        self._batch_size = 1
+
+    def start(self, maxsize, batch_size, overflow):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._overflow = overflow
+            self._batch_size = batch_size
+            self._queue = queue.Queue(maxsize)
+            self._thread = threading.Thread(
+                target=self._run, args=(self._queue,), name=f"log-sink-{self.name}", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        with self._lock:
+            q, thread = self._queue, self._thread
+            if thread is None:
+                return
+            self._queue, self._thread = None, None
+            while self._putting:
+                self._idle.wait()
+        q.put(_STOP)
+        thread.join()
+
+    def _put(self, item, block):
+        with self._lock:
+            q = self._queue
+            if q is None:
+                return False
+            self._putting += 1
+        try:
+            q.put(item, block=block)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+        finally:
+            with self._lock:
+                self._putting -= 1
+                if not self._putting:
+                    self._idle.notify_all()
+        return True
+
+    def flush(self):
+        done = threading.Event()
+        if self._put(done, block=True):
+            done.wait()
+
+    def __call__(self, message):
+        if not self._put(message, block=self._overflow == BLOCK):
+            self._emit([message])
+
+    def _emit(self, messages):
+        with self._write_lock:
+            for message in messages:
+                self._write(message)
+            self._flush()
+            self.written += len(messages)
+
+    def _run(self, q):
+        while True:
+            batch = [q.get()]
+            while len(batch) < self._batch_size:
+                try:
+                    batch.append(q.get_nowait())
+                except queue.Empty:
+                    break
+            messages = [m for m in batch if isinstance(m, str)]
+            if messages:
+                try:
+                    self._emit(messages)
+                except Exception as err:
+                    sys.stderr.write(f"log sink {self.name} failed: {err}\n")
+            for marker in batch:
+                if isinstance(marker, threading.Event):
+                    marker.set()
+            if _STOP in batch:
+                return
+
+    def stats(self):
+        q = self._queue
+        queued = q.qsize() if q is not None else 0
+        return {"queued": queued, "written": self.written, "dropped": self.dropped}
+
+
+def _new_logger():
+    # type: () -> Logger
     _log = Logger(
         core=Core(),
         exception=None,
@@ -32,7 +154,46 @@ def getLogger(module):
         extra={},
     )
     _log.remove()
-    _log.add(sys.stdout, level=INFO, format=LOG_FORMAT, backtrace=True)
+    return _log
+
+
+def _shared_sink(name, factory):
+    with _sinks_lock:
+        sink = _sinks.get(name)
+        if sink is None:
+            sink = _sinks[name] = factory()
+            if _async["enabled"]:
+                sink.start(_async["maxsize"], _async["batch_size"], _async["overflow"])
+        return sink
+
+
+def _open_stdout():
+    return lambda s: sys.stdout.write(s), lambda: sys.stdout.flush()
+
+
+def _open_file(log_path):
+    # loguru's own file writer keeps rotation and retention, records arrive already formatted.
+    # it is used bare: a second logger behind this sink would nest handler locks, and
+    # loguru's at-fork hook takes those in an order that deadlocks against it.
+    # line buffered like loguru's default, so lines from forked workers never interleave.
+    writer = FileSink(log_path, rotation="00:00", retention=0, encoding="utf8")
+    return writer.write, lambda: None
+
+
+def _stdout_sink():
+    return _Sink("stdout", _open_stdout)
+
+
+def _file_sink(log_path):
+    return _Sink(log_path, functools.partial(_open_file, log_path))
+
+
+@functools.lru_cache(maxsize=None)
+def getLogger(module):
+    # type: (str) -> Logger
+    _log = _new_logger()
+    sink = _shared_sink("stdout", _stdout_sink)
+    _log.add(sink, level=INFO, format=LOG_FORMAT, backtrace=True)
     return _log
 
 
@@ -40,33 +201,14 @@ def getLogger(module):
 def getFileLogger(module):
     # type: (str) -> Logger
     mod = module.replace(".", os.sep)
-    _log = Logger(
-        core=Core(),
-        exception=None,
-        depth=0,
-        record=False,
-        lazy=False,
-        colors=False,
-        raw=False,
-        capture=True,
-        patcher=None,
-        extra={},
-    )
-    _log.remove()
+    _log = _new_logger()
 
     log_dirs = os.path.join(os.getcwd(), "data", "logs", mod)
     if not os.path.exists(log_dirs):
         os.makedirs(log_dirs)
     log_path = os.path.join(log_dirs, "{time:YYYY-MM-DD}.log")
-    _log.add(
-        log_path,
-        level=DEBUG,
-        format=LOG_FORMAT,
-        backtrace=True,
-        rotation="00:00",
-        retention=0,
-        encoding="utf8",
-    )
+    sink = _shared_sink(log_path, functools.partial(_file_sink, log_path))
+    _log.add(sink, level=DEBUG, format=LOG_FORMAT, backtrace=True)
     return _log
 
 
@@ -83,3 +225,62 @@ def setLevel(logger, level_name):
             if level_name == "DEBUG":
                 handler._exception_formatter._backtrace = True
             handler._levelno = nu
+
+
+def setAsync(enabled=True, maxsize=10000, batch_size=512, overflow=DROP):
+    # type: (bool, int, int, str) -> None
+    """
+    Switch every sink to a background writer with a bounded queue, or back to inline writes.
+    `overflow` is DROP to discard records when the queue is full, or BLOCK to wait for room.
+    """
+    if overflow not in (DROP, BLOCK):
+        raise ValueError(f"unknown overflow policy: {overflow}")
+    with _sinks_lock:
+        _async.update(enabled=enabled, maxsize=maxsize, batch_size=max(batch_size, 1), overflow=overflow)
+        for sink in _sinks.values():
+            sink.stop()
+            if enabled:
+                sink.start(maxsize, _async["batch_size"], overflow)
+
+
+def getStats():
+    # type: () -> dict
+    with _sinks_lock:
+        return {name: sink.stats() for name, sink in _sinks.items()}
+
+
+def flush():
+    # type: () -> None
+    """Block until every record queued so far is written, the writers keep running."""
+    with _sinks_lock:
+        sinks = list(_sinks.values())
+    for sink in sinks:
+        sink.flush()
+
+
+@atexit.register
+def _shutdown():
+    # stop the writers for good, anything logged later is written inline.
+    with _sinks_lock:
+        _async["enabled"] = False
+        for sink in _sinks.values():
+            sink.stop()
+
+
+def _after_fork_in_child():
+    # the writer threads did not survive the fork and their locks may be held forever:
+    # start over with fresh locks and queues, what the parent had queued is its own to write.
+    global _sinks_lock
+    _sinks_lock = threading.Lock()
+    for sink in _sinks.values():
+        sink._reset()
+        # the parent's writer may have held the file buffer's lock, which also dies with
+        # the fork: reopen, and keep the old one referenced so it is never flushed or closed.
+        _orphans.append((sink._write, sink._flush))
+        sink._write, sink._flush = sink._opener()
+        if _async["enabled"]:
+            sink.start(_async["maxsize"], _async["batch_size"], _async["overflow"])
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
@@ -1,8 +1,14 @@
+import asyncio
 import os
+import selectors
+import signal
 import sys
 import subprocess
+import time
 
-__all__ = ["execute"]
+__all__ = ["execute", "iter_execute", "execute_many", "async_execute_many"]
+
+codec = "utf8"
 
 
 def _patch_windows():
@@ -20,31 +26,133 @@ def _patch_windows():
     return SUBPROCESS_FLAG
 
 
-def execute(cmd):
-    if sys.version_info >= (3, 7):
-        proc = subprocess.Popen(
-            cmd,
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            creationflags=_patch_windows(),
-            encoding="utf8",
-            text=True,
-            shell=True,
-            env=os.environ.copy(),
-        )
-    else:
-        proc = subprocess.Popen(
+def _popen_kwargs():
+    # run every command in its own process group, so a timeout can take down
+    # the whole tree spawned by the shell and not only the shell itself.
+    return dict(
+        creationflags=_patch_windows(),
+        start_new_session=not sys.platform.startswith("win"),
+        env=os.environ.copy(),
+    )
+
+
+def _kill(proc):
+    if sys.platform.startswith("win"):
+        proc.kill()
+        return
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def execute(cmd, timeout=None):
+    proc = subprocess.Popen(
+        cmd,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        encoding=codec,
+        errors="replace",
+        shell=True,
+        **_popen_kwargs(),
+    )
+    try:
+        stdout, stderr = proc.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        _kill(proc)
+        stdout, stderr = proc.communicate()
+        raise subprocess.TimeoutExpired(cmd, timeout, output=stdout, stderr=stderr)
+    except BaseException:
+        _kill(proc)
+        proc.wait()
+        raise
+    return proc.returncode, stdout or None, stderr or None
+
+
+def iter_execute(cmd, timeout=None, chunk_size=65536):
+    """
+    Yield ("stdout" | "stderr", line) as soon as the command writes them.
+    The return code is available as the generator's return value.
+    """
+    merged = sys.platform.startswith("win")  # selectors can't poll pipes on windows
+    proc = subprocess.Popen(
+        cmd,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT if merged else subprocess.PIPE,
+        shell=True,
+        bufsize=0,
+        **_popen_kwargs(),
+    )
+    deadline = time.monotonic() + timeout if timeout else None
+    try:
+        if merged:
+            for line in proc.stdout:
+                yield "stdout", line.decode(codec, errors="replace")
+                if deadline and time.monotonic() > deadline:
+                    raise subprocess.TimeoutExpired(cmd, timeout)
+        else:
+            pending = {"stdout": b"", "stderr": b""}
+            with selectors.DefaultSelector() as selector:
+                selector.register(proc.stdout, selectors.EVENT_READ, "stdout")
+                selector.register(proc.stderr, selectors.EVENT_READ, "stderr")
+                while selector.get_map():
+                    remains = deadline - time.monotonic() if deadline else None
+                    if remains is not None and remains <= 0:
+                        raise subprocess.TimeoutExpired(cmd, timeout)
+                    for key, _ in selector.select(remains):
+                        name = key.data
+                        chunk = os.read(key.fd, chunk_size)
+                        if not chunk:
+                            selector.unregister(key.fileobj)
+                            if pending[name]:
+                                yield name, pending[name].decode(codec, errors="replace")
+                            continue
+                        *lines, pending[name] = (pending[name] + chunk).split(b"\n")
+                        for line in lines:
+                            yield name, line.decode(codec, errors="replace") + "\n"
+        remains = deadline - time.monotonic() if deadline else None
+        return proc.wait(timeout=max(remains, 0) if remains is not None else None)
+    except BaseException:
+        _kill(proc)
+        raise
+    finally:
+        proc.stdout.close()
+        if proc.stderr:
+            proc.stderr.close()
+        proc.wait()
+
+
+async def _async_execute(cmd, semaphore, timeout=None):
+    async with semaphore:
+        proc = await asyncio.create_subprocess_shell(
             cmd,
-            stdin=subprocess.PIPE,
+            stdin=subprocess.DEVNULL,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
-            creationflags=_patch_windows(),
-            encoding="utf8",
-            shell=True,
-            env=os.environ.copy(),
+            **_popen_kwargs(),
         )
-    proc.wait()
-    stdout = "\n".join(proc.stdout.readlines()) or None
-    stderr = "\n".join(proc.stderr.readlines()) or None
-    return proc.returncode, stdout, stderr
+        try:
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+        except BaseException:
+            _kill(proc)
+            await proc.wait()
+            raise
+        stdout = stdout.decode(codec, errors="replace") or None
+        stderr = stderr.decode(codec, errors="replace") or None
+        return proc.returncode, stdout, stderr
+
+
+async def async_execute_many(cmds, limit=8, timeout=None):
+    """
+    Run commands concurrently, at most `limit` at a time.
+    Results keep the order of `cmds`; a command that times out yields asyncio.TimeoutError.
+    """
+    semaphore = asyncio.Semaphore(limit)
+    tasks = [_async_execute(cmd, semaphore, timeout) for cmd in cmds]
+    return await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def execute_many(cmds, limit=8, timeout=None):
+    return asyncio.run(async_execute_many(cmds, limit, timeout))
@@ -0,0 +1,57 @@
+import os
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("loguru")
+
+import logs
+
+
+def _wait(pid, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        done, status = os.waitpid(pid, os.WNOHANG)
+        if done:
+            return os.waitstatus_to_exitcode(status)
+        time.sleep(0.01)
+    os.kill(pid, 9)
+    os.waitpid(pid, 0)
+    return None
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires os.fork")
+@pytest.mark.parametrize("asynchronous", [False, True])
+def test_fork_while_logging(tmp_path, monkeypatch, asynchronous):
+    monkeypatch.chdir(tmp_path)
+    logs.setAsync(asynchronous, maxsize=100, overflow=logs.BLOCK)
+    log = logs.getFileLogger(f"fork.{'async' if asynchronous else 'sync'}")
+    stopped = threading.Event()
+
+    def _produce():
+        while not stopped.is_set():
+            log.info("parent record")
+
+    threads = [threading.Thread(target=_produce) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    try:
+        for _ in range(100):
+            pid = os.fork()
+            if pid == 0:
+                try:
+                    log.info("child record")
+                    logs.flush()
+                finally:
+                    os._exit(0)
+            assert _wait(pid, 10) == 0
+    finally:
+        stopped.set()
+        for thread in threads:
+            thread.join()
+        logs.flush()
+        logs.setAsync(False)
+
+    content = "".join(path.read_text() for path in tmp_path.rglob("*.log"))
+    assert content.count("child record") == 100